@@ -6,38 +6,57 @@ Quick health check for EVPN-VxLAN fabric
 import json
 import sys
 from datetime import datetime
+from enum import IntEnum
+from typing import NamedTuple
+
+_BANNER = "=" * 60
+
+
+class Status(IntEnum):
+    """Check outcome; anything non-zero means the check failed"""
+    HEALTHY = 0
+    FAILED = 1
+
+
+class Check(NamedTuple):
+    """A single fabric health check and its result"""
+    name: str
+    state: str
+    status: Status
+    details: str
+
+
+CHECKS = (
+    Check("BGP Sessions", "UP", Status.HEALTHY, "All 8 sessions established"),
+    Check("EVPN Peers", "UP", Status.HEALTHY, "4 EVPN peers active"),
+    Check("VXLAN Tunnels", "UP", Status.HEALTHY, "6 tunnels established"),
+    Check("Host Connectivity", "UP", Status.HEALTHY, "All hosts reachable"),
+    Check("CPU Usage", "OK", Status.HEALTHY, "Average 12% across fabric"),
+    Check("Memory Usage", "OK", Status.HEALTHY, "Average 34% across fabric"),
+)
 
 
 def check_fabric_health():
     """Run basic health checks on the fabric"""
-    
-    print("=" * 60)
+
+    print(_BANNER)
     print(f"EVPN-VxLAN Fabric Health Check")
-    print(f"Timestamp: {datetime.now().isoformat()}")
-    print("=" * 60)
-    
-    checks = {
-        "BGP Sessions": {"status": "UP", "details": "All 8 sessions established"},
-        "EVPN Peers": {"status": "UP", "details": "4 EVPN peers active"},
-        "VXLAN Tunnels": {"status": "UP", "details": "6 tunnels established"},
-        "Host Connectivity": {"status": "UP", "details": "All hosts reachable"},
-        "CPU Usage": {"status": "OK", "details": "Average 12% across fabric"},
-        "Memory Usage": {"status": "OK", "details": "Average 34% across fabric"},
-    }
-    
+    print(f"Timestamp: {datetime.now().isoformat(timespec='seconds')}")
+    print(_BANNER)
+
     all_healthy = True
-    
-    for check, result in checks.items():
-        status_emoji = "✅" if result["status"] in ["UP", "OK"] else "❌"
-        print(f"{status_emoji} {check}: {result['status']} - {result['details']}")
-        
-        if result["status"] not in ["UP", "OK"]:
+
+    for check in CHECKS:
+        status_emoji = "❌" if check.status else "✅"
+        print(f"{status_emoji} {check.name}: {check.state} - {check.details}")
+
+        if check.status:
             all_healthy = False
-    
-    print("=" * 60)
+
+    print(_BANNER)
     print(f"Overall Status: {'HEALTHY' if all_healthy else 'ISSUES DETECTED'}")
-    print("=" * 60)
-    
+    print(_BANNER)
+
     return all_healthy
 
 
@@ -6,17 +6,20 @@ Description: Simulates various AI/ML collective communication patterns
 """
 
 import argparse
+import asyncio
 import json
 import logging
+import math
 import multiprocessing
 import socket
-import subprocess
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, List, Dict, Tuple, Union
 import numpy as np
+import orjson
 
 # Configure logging
 logging.basicConfig(
@@ -25,10 +28,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Reuse one SSH connection per host for back-to-back commands. The
+# iperf3 server start warms the master connection, so every client flow
+# launched from that host rides the same authenticated session instead
+# of paying a fresh TCP + auth handshake.
+SSH_MUX_OPTIONS = [
+    '-o', 'ControlMaster=auto',
+    '-o', 'ControlPersist=60s',
+    '-o', 'ControlPath=~/.ssh/cm-%r@%h:%p',
+]
 
-@dataclass
+
+@dataclass(frozen=True)
 class TrafficPattern:
     """Represents an AI traffic pattern"""
+    # Declared by hand: dataclass(slots=True) needs Python 3.10+
+    __slots__ = ('name', 'description', 'message_size', 'duration',
+                 'connections_per_host', 'bidirectional')
+    
     name: str
     description: str
     message_size: int
@@ -37,6 +54,51 @@ class TrafficPattern:
     bidirectional: bool
 
 
+@dataclass
+class FlowFailure:
+    """A failed iperf3 flow; stderr is only decoded if someone reads it"""
+    __slots__ = ('stderr',)
+    
+    stderr: bytes
+    
+    @property
+    def error(self) -> str:
+        return self.stderr.decode('utf-8', 'replace')
+
+
+@lru_cache(maxsize=None)
+def _apply_overrides(pattern: TrafficPattern,
+                     overrides: Tuple[Tuple[str, Any], ...]) -> TrafficPattern:
+    """Return a copy of pattern with any matching field overrides applied"""
+    fields = {key: value for key, value in overrides if key in pattern.__dataclass_fields__}
+    return replace(pattern, **fields) if fields else pattern
+
+
+@lru_cache(maxsize=None)
+def _reduce_scatter_targets(total_hosts: int) -> Tuple[Tuple[int, ...], ...]:
+    """Get target hosts for reduce-scatter phase, one row per source host"""
+    # Simple strategy: each host sends to next sqrt(N) hosts
+    chunk_size = math.isqrt(total_hosts)
+    offsets = np.arange(1, chunk_size + 1)
+    matrix = (np.arange(total_hosts)[:, None] + offsets[None, :]) % total_hosts
+    return tuple(map(tuple, matrix.tolist()))
+
+
+def _flow_records(obj):
+    """orjson default hook: render a flow table as JSON flow records"""
+    if isinstance(obj, np.ndarray) and obj.dtype.names:
+        return [
+            {'src': src, 'dst': dst, 'bandwidth_gbps': bw, 'retransmits': retransmits}
+            for src, dst, bw, retransmits in zip(
+                obj['src'].tolist(),
+                obj['dst'].tolist(),
+                np.round(obj['bandwidth_gbps'], 2).tolist(),
+                obj['retransmits'].tolist()
+            )
+        ]
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
 class AITrafficGenerator:
     """Generates AI/ML-specific traffic patterns"""
     
@@ -84,11 +146,47 @@ class AITrafficGenerator:
         )
     }
     
-    def __init__(self, topology_file: str):
-        """Initialize traffic generator with topology"""
+    def __init__(self, topology_file: str, record_flows: bool = True):
+        """Initialize traffic generator with topology
+        
+        record_flows controls whether per-flow records are kept in the
+        results; aggregates are always computed.
+        """
         self.topology = self._load_topology(topology_file)
+        self.record_flows = record_flows
         self.hosts = self._extract_hosts()
+        self.n_hosts = len(self.hosts)
+        name_width = max((len(host['name']) for host in self.hosts), default=1)
+        self._flow_dtype = np.dtype([
+            ('src', f'U{name_width}'),
+            ('dst', f'U{name_width}'),
+            ('bandwidth_gbps', np.float64),
+            ('retransmits', np.int64),
+            ('cpu_percent', np.float64),
+        ])
+        # Every ordered (src, dst) index pair, used by the all-to-all patterns
+        self.host_pairs = [
+            (i, j)
+            for i in range(self.n_hosts)
+            for j in range(self.n_hosts)
+            if i != j
+        ]
+        # The ssh argv up to the remote command never changes per host
+        self._ssh_prefix = {
+            host['mgmt_ip']: [
+                'sshpass', '-p', 'cumulus',
+                'ssh', *SSH_MUX_OPTIONS, f"cumulus@{host['mgmt_ip']}"
+            ]
+            for host in self.hosts
+        }
         self.results = {}
+        self._dispatch = {
+            'allreduce': self._generate_allreduce,
+            'allgather': self._generate_allgather,
+            'broadcast': self._generate_broadcast,
+            'ring': self._generate_ring,
+            'parameter_server': self._generate_parameter_server,
+        }
         
     def _load_topology(self, topology_file: str) -> Dict:
         """Load topology from JSON file"""
@@ -111,23 +209,12 @@ class AITrafficGenerator:
         pattern = self.PATTERNS[pattern_name]
         logger.info(f"Generating {pattern.name} traffic pattern")
         
-        # Override default parameters if custom ones provided
+        # Override default parameters on a copy; PATTERNS stays pristine
         if custom_params:
-            for key, value in custom_params.items():
-                if hasattr(pattern, key):
-                    setattr(pattern, key, value)
+            pattern = _apply_overrides(pattern, tuple(sorted(custom_params.items())))
         
         # Execute pattern
-        if pattern_name == 'allreduce':
-            self._generate_allreduce(pattern)
-        elif pattern_name == 'allgather':
-            self._generate_allgather(pattern)
-        elif pattern_name == 'broadcast':
-            self._generate_broadcast(pattern)
-        elif pattern_name == 'ring':
-            self._generate_ring(pattern)
-        elif pattern_name == 'parameter_server':
-            self._generate_parameter_server(pattern)
+        self._dispatch[pattern_name](pattern)
             
     def _generate_allreduce(self, pattern: TrafficPattern):
         """Generate AllReduce traffic pattern"""
@@ -135,47 +222,32 @@ class AITrafficGenerator:
         
         # Phase 1: Reduce-scatter
         logger.info("Phase 1: Reduce-scatter")
-        with ThreadPoolExecutor(max_workers=len(self.hosts)) as executor:
-            futures = []
-            
-            for i, src_host in enumerate(self.hosts):
-                # Each host sends to subset of others
-                targets = self._get_reduce_scatter_targets(i, len(self.hosts))
-                
-                for target_idx in targets:
-                    if target_idx != i:
-                        dst_host = self.hosts[target_idx]
-                        future = executor.submit(
-                            self._run_iperf_client,
-                            src_host,
-                            dst_host,
-                            pattern.duration // 2,
-                            pattern.message_size // len(self.hosts)
-                        )
-                        futures.append((future, src_host['name'], dst_host['name']))
-            
-            # Collect results
-            phase1_results = self._collect_results(futures, "reduce-scatter")
+        flows = []
+        targets_matrix = _reduce_scatter_targets(self.n_hosts)
+        
+        for i, src_host in enumerate(self.hosts):
+            # Each host sends to subset of others
+            for target_idx in targets_matrix[i]:
+                if target_idx != i:
+                    flows.append((src_host, self.hosts[target_idx]))
+        
+        phase1_results = self._run_flows(
+            flows,
+            pattern.duration // 2,
+            pattern.message_size // self.n_hosts,
+            "reduce-scatter"
+        )
         
         # Phase 2: Allgather
         logger.info("Phase 2: Allgather")
-        with ThreadPoolExecutor(max_workers=len(self.hosts)) as executor:
-            futures = []
-            
-            for i, src_host in enumerate(self.hosts):
-                for j, dst_host in enumerate(self.hosts):
-                    if i != j:
-                        future = executor.submit(
-                            self._run_iperf_client,
-                            src_host,
-                            dst_host,
-                            pattern.duration // 2,
-                            pattern.message_size // len(self.hosts)
-                        )
-                        futures.append((future, src_host['name'], dst_host['name']))
-            
-            # Collect results
-            phase2_results = self._collect_results(futures, "allgather")
+        flows = [(self.hosts[i], self.hosts[j]) for i, j in self.host_pairs]
+        
+        phase2_results = self._run_flows(
+            flows,
+            pattern.duration // 2,
+            pattern.message_size // self.n_hosts,
+            "allgather"
+        )
         
         # Combine results
         self.results['allreduce'] = {
@@ -188,24 +260,12 @@ class AITrafficGenerator:
         """Generate AllGather traffic pattern"""
         logger.info("Starting AllGather pattern generation")
         
-        with ThreadPoolExecutor(max_workers=len(self.hosts) * len(self.hosts)) as executor:
-            futures = []
-            
-            # All-to-all communication
-            for src_host in self.hosts:
-                for dst_host in self.hosts:
-                    if src_host != dst_host:
-                        future = executor.submit(
-                            self._run_iperf_client,
-                            src_host,
-                            dst_host,
-                            pattern.duration,
-                            pattern.message_size
-                        )
-                        futures.append((future, src_host['name'], dst_host['name']))
-            
-            results = self._collect_results(futures, "allgather")
-            self.results['allgather'] = results
+        # All-to-all communication
+        flows = [(self.hosts[i], self.hosts[j]) for i, j in self.host_pairs]
+        
+        self.results['allgather'] = self._run_flows(
+            flows, pattern.duration, pattern.message_size, "allgather"
+        )
     
     def _generate_broadcast(self, pattern: TrafficPattern):
         """Generate broadcast traffic pattern"""
@@ -214,45 +274,26 @@ class AITrafficGenerator:
         # Select root node (first host)
         root_host = self.hosts[0]
         
-        with ThreadPoolExecutor(max_workers=len(self.hosts) - 1) as executor:
-            futures = []
-            
-            # Root broadcasts to all others
-            for dst_host in self.hosts[1:]:
-                future = executor.submit(
-                    self._run_iperf_client,
-                    root_host,
-                    dst_host,
-                    pattern.duration,
-                    pattern.message_size
-                )
-                futures.append((future, root_host['name'], dst_host['name']))
-            
-            results = self._collect_results(futures, "broadcast")
-            self.results['broadcast'] = results
+        # Root broadcasts to all others
+        flows = [(root_host, dst_host) for dst_host in self.hosts[1:]]
+        
+        self.results['broadcast'] = self._run_flows(
+            flows, pattern.duration, pattern.message_size, "broadcast"
+        )
     
     def _generate_ring(self, pattern: TrafficPattern):
         """Generate ring-based traffic pattern"""
         logger.info("Starting Ring pattern generation")
         
-        with ThreadPoolExecutor(max_workers=len(self.hosts)) as executor:
-            futures = []
-            
-            # Each host sends to next in ring
-            for i, src_host in enumerate(self.hosts):
-                dst_host = self.hosts[(i + 1) % len(self.hosts)]
-                
-                future = executor.submit(
-                    self._run_iperf_client,
-                    src_host,
-                    dst_host,
-                    pattern.duration,
-                    pattern.message_size
-                )
-                futures.append((future, src_host['name'], dst_host['name']))
-            
-            results = self._collect_results(futures, "ring")
-            self.results['ring'] = results
+        # Each host sends to next in ring
+        flows = [
+            (src_host, self.hosts[(i + 1) % self.n_hosts])
+            for i, src_host in enumerate(self.hosts)
+        ]
+        
+        self.results['ring'] = self._run_flows(
+            flows, pattern.duration, pattern.message_size, "ring"
+        )
     
     def _generate_parameter_server(self, pattern: TrafficPattern):
         """Generate parameter server traffic pattern"""
@@ -262,80 +303,75 @@ class AITrafficGenerator:
         ps_host = self.hosts[0]
         worker_hosts = self.hosts[1:]
         
-        with ThreadPoolExecutor(max_workers=len(worker_hosts) * 2) as executor:
-            futures = []
-            
-            # Workers push gradients to PS
-            for worker in worker_hosts:
-                future = executor.submit(
-                    self._run_iperf_client,
-                    worker,
-                    ps_host,
-                    pattern.duration,
-                    pattern.message_size
-                )
-                futures.append((future, worker['name'], ps_host['name']))
-            
-            # PS pushes updated parameters to workers
-            for worker in worker_hosts:
-                future = executor.submit(
-                    self._run_iperf_client,
-                    ps_host,
-                    worker,
-                    pattern.duration,
-                    pattern.message_size
-                )
-                futures.append((future, ps_host['name'], worker['name']))
-            
-            results = self._collect_results(futures, "parameter_server")
-            self.results['parameter_server'] = results
+        # Workers push gradients to PS, PS pushes updated parameters to workers
+        flows = [(worker, ps_host) for worker in worker_hosts]
+        flows += [(ps_host, worker) for worker in worker_hosts]
+        
+        self.results['parameter_server'] = self._run_flows(
+            flows, pattern.duration, pattern.message_size, "parameter_server"
+        )
+    
+    def _run_flows(self, flows: List[Tuple[Dict, Dict]], duration: int,
+                   message_size: int, pattern_name: str) -> Dict:
+        """Run iperf3 flows concurrently and aggregate their results"""
+        results = asyncio.run(self._launch_flows(flows, duration, message_size))
+        return self._collect_results(flows, results, pattern_name)
     
-    def _run_iperf_client(self, src_host: Dict, dst_host: Dict, 
-                         duration: int, message_size: int) -> Dict:
+    async def _launch_flows(self, flows: List[Tuple[Dict, Dict]], duration: int,
+                            message_size: int) -> List:
+        """Start every flow on one event loop and wait for all of them"""
+        # Each iperf3 -s serves one test at a time, so flows to the same
+        # destination take turns instead of failing with "server is busy"
+        servers = {dst_host['data_ip']: asyncio.Lock() for _, dst_host in flows}
+        return await asyncio.gather(
+            *(self._run_queued_flow(servers[dst_host['data_ip']], src_host, dst_host,
+                                    duration, message_size)
+              for src_host, dst_host in flows),
+            return_exceptions=True
+        )
+    
+    async def _run_queued_flow(self, server: asyncio.Lock, src_host: Dict, dst_host: Dict,
+                               duration: int, message_size: int) -> Union[Dict, FlowFailure]:
+        """Run one iperf3 client once its destination server is free"""
+        async with server:
+            return await self._run_iperf_client(src_host, dst_host, duration, message_size)
+    
+    async def _run_iperf_client(self, src_host: Dict, dst_host: Dict, 
+                                duration: int, message_size: int) -> Union[Dict, FlowFailure]:
         """Run iperf3 client on source host"""
         try:
             # Calculate parallel streams based on message size
             parallel_streams = min(8, max(1, message_size // 100_000_000))
             
-            cmd = [
-                'sshpass', '-p', 'cumulus',
-                'ssh', f"cumulus@{src_host['mgmt_ip']}",
+            # -Z sends with sendfile() so the host is not copy-bound at 100G
+            cmd = self._ssh_argv(
+                src_host,
                 f"iperf3 -c {dst_host['data_ip']} -t {duration} "
-                f"-P {parallel_streams} -l {min(message_size, 1_000_000)} -J"
-            ]
+                f"-P {parallel_streams} -l {min(message_size, 1_000_000)} -Z -J"
+            )
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=duration + 30)
+            stdout, stderr, returncode = await self._exec(cmd, timeout=duration + 30)
             
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
+            if returncode == 0:
+                data = orjson.loads(stdout)
                 return {
-                    'success': True,
                     'bandwidth_bps': data['end']['sum_sent']['bits_per_second'],
                     'retransmits': data['end']['sum_sent'].get('retransmits', 0),
                     'cpu_percent': data['end']['cpu_utilization_percent']['host_total']
                 }
             else:
-                logger.error(f"iperf3 failed: {result.stderr}")
-                return {'success': False, 'error': result.stderr}
+                return FlowFailure(stderr)
                 
+        except asyncio.TimeoutError:
+            logger.error(f"iperf3 timed out after {duration + 30}s")
+            return FlowFailure(b'timeout')
         except Exception as e:
             logger.error(f"Error running iperf3: {e}")
-            return {'success': False, 'error': str(e)}
+            return FlowFailure(str(e).encode())
     
-    def _get_reduce_scatter_targets(self, host_idx: int, total_hosts: int) -> List[int]:
-        """Get target hosts for reduce-scatter phase"""
-        # Simple strategy: each host sends to next sqrt(N) hosts
-        chunk_size = int(np.sqrt(total_hosts))
-        targets = []
-        
-        for i in range(chunk_size):
-            target = (host_idx + i + 1) % total_hosts
-            targets.append(target)
-            
-        return targets
-    
-    def _collect_results(self, futures: List[Tuple], pattern_name: str) -> Dict:
-        """Collect and aggregate results from futures"""
+    def _collect_results(self, flows: List[Tuple[Dict, Dict]], flow_results: List,
+                         pattern_name: str) -> Dict:
+        """Aggregate per-flow results, given in the same order as flows"""
         results = {
             'pattern': pattern_name,
             'flows': [],
@@ -344,38 +380,40 @@ class AITrafficGenerator:
             'avg_cpu_percent': 0
         }
         
-        total_bandwidth = 0
-        total_cpu = 0
+        # Successful flows are packed into a preallocated structured array;
+        # bandwidth is only rounded when the report is rendered
+        flow_table = np.zeros(len(flows), dtype=self._flow_dtype)
         successful_flows = 0
         
-        for future, src, dst in futures:
-            try:
-                result = future.result(timeout=300)
-                
-                if result['success']:
-                    bandwidth_gbps = result['bandwidth_bps'] / 1e9
-                    results['flows'].append({
-                        'src': src,
-                        'dst': dst,
-                        'bandwidth_gbps': round(bandwidth_gbps, 2),
-                        'retransmits': result['retransmits']
-                    })
-                    total_bandwidth += bandwidth_gbps
-                    total_cpu += result['cpu_percent']
-                    successful_flows += 1
-                else:
-                    results['failed_flows'] += 1
-                    logger.warning(f"Flow {src}->{dst} failed: {result.get('error', 'Unknown')}")
-                    
-            except Exception as e:
-                logger.error(f"Error collecting result for {src}->{dst}: {e}")
+        for (src_host, dst_host), result in zip(flows, flow_results):
+            src, dst = src_host['name'], dst_host['name']
+            
+            if isinstance(result, BaseException):
+                logger.error(f"Error collecting result for {src}->{dst}: {result}")
+                results['failed_flows'] += 1
+            elif isinstance(result, FlowFailure):
                 results['failed_flows'] += 1
+                logger.warning(f"Flow {src}->{dst} failed: {result.error}")
+            else:
+                flow_table[successful_flows] = (
+                    src,
+                    dst,
+                    result['bandwidth_bps'] / 1e9,
+                    result['retransmits'],
+                    result['cpu_percent']
+                )
+                successful_flows += 1
+        
+        flow_table = flow_table[:successful_flows]
+        if self.record_flows:
+            results['flows'] = flow_table
         
         # Calculate aggregates
         if successful_flows > 0:
-            results['total_bandwidth_gbps'] = round(total_bandwidth, 2)
-            results['avg_cpu_percent'] = round(total_cpu / successful_flows, 2)
-            results['avg_per_flow_gbps'] = round(total_bandwidth / successful_flows, 2)
+            bw = flow_table['bandwidth_gbps']
+            results['total_bandwidth_gbps'] = round(float(bw.sum()), 2)
+            results['avg_cpu_percent'] = round(float(flow_table['cpu_percent'].mean()), 2)
+            results['avg_per_flow_gbps'] = round(float(bw.mean()), 2)
         
         return results
     
@@ -412,29 +450,63 @@ class AITrafficGenerator:
         # Generate report
         self.generate_report()
     
+    def _ssh_argv(self, host: Dict, remote_cmd: str) -> List[str]:
+        """Build the ssh argv for running a command on a host"""
+        return self._ssh_prefix[host['mgmt_ip']] + [remote_cmd]
+    
+    async def _exec(self, cmd: List[str], timeout: float) -> Tuple[bytes, bytes, int]:
+        """Run a command without blocking the event loop"""
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        return stdout, stderr, proc.returncode
+    
+    async def _ssh_run(self, cmd: List[str]):
+        """Run an ssh command, logging instead of raising on timeout"""
+        try:
+            return await self._exec(cmd, timeout=15)
+        except asyncio.TimeoutError:
+            logger.warning(f"Command timed out on {cmd[-2]}: {cmd[-1]}")
+            return None
+    
+    async def _run_on_all_hosts_async(self, remote_cmd: str):
+        """Run the same command on every host concurrently"""
+        await asyncio.gather(
+            *(self._ssh_run(self._ssh_argv(host, remote_cmd)) for host in self.hosts)
+        )
+    
+    def _run_on_all_hosts(self, remote_cmd: str):
+        """Run the same command on every host in parallel"""
+        asyncio.run(self._run_on_all_hosts_async(remote_cmd))
+    
     def _start_iperf_servers(self):
         """Start iperf3 servers on all hosts"""
         logger.info("Starting iperf3 servers on all hosts")
-        
-        for host in self.hosts:
-            cmd = [
-                'sshpass', '-p', 'cumulus',
-                'ssh', f"cumulus@{host['mgmt_ip']}",
-                'pkill iperf3; nohup iperf3 -s -D'
-            ]
-            subprocess.run(cmd, capture_output=True)
+        self._run_on_all_hosts('pkill iperf3; nohup iperf3 -s -D')
     
     def _stop_iperf_servers(self):
         """Stop iperf3 servers on all hosts"""
         logger.info("Stopping iperf3 servers")
-        
-        for host in self.hosts:
-            cmd = [
-                'sshpass', '-p', 'cumulus',
-                'ssh', f"cumulus@{host['mgmt_ip']}",
-                'pkill iperf3'
-            ]
-            subprocess.run(cmd, capture_output=True)
+        self._run_on_all_hosts('pkill iperf3')
+    
+    def _write_text_report(self, report_text: str):
+        """Write the human-readable report"""
+        with open('traffic_generation_report.txt', 'w') as f:
+            f.write(report_text)
+    
+    def _write_json_results(self):
+        """Serialize and write the detailed JSON results"""
+        with open('traffic_generation_results.json', 'wb') as f:
+            f.write(orjson.dumps(self.results, default=_flow_records,
+                                 option=orjson.OPT_INDENT_2))
     
     def generate_report(self):
         """Generate comprehensive traffic generation report"""
@@ -475,15 +547,16 @@ class AITrafficGenerator:
         )
         report.append(f"Combined Bandwidth (all patterns): {total_bandwidth} Gbps")
         
-        # Save report
+        # Save the text report and detailed JSON results concurrently
         report_text = '\n'.join(report)
         
-        with open('traffic_generation_report.txt', 'w') as f:
-            f.write(report_text)
-        
-        # Save detailed JSON results
-        with open('traffic_generation_results.json', 'w') as f:
-            json.dump(self.results, f, indent=2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            writes = [
+                executor.submit(self._write_text_report, report_text),
+                executor.submit(self._write_json_results),
+            ]
+            for write in writes:
+                write.result()
         
         print(report_text)
         logger.info("Report saved to traffic_generation_report.txt")
@@ -517,11 +590,16 @@ def main():
         type=int,
         help='Override default message size (bytes)'
     )
+    parser.add_argument(
+        '--summary-only',
+        action='store_true',
+        help='Only keep aggregate results, not per-flow records'
+    )
     
     args = parser.parse_args()
     
     # Initialize generator
-    generator = AITrafficGenerator(args.topology)
+    generator = AITrafficGenerator(args.topology, record_flows=not args.summary_only)
     
     # Prepare custom parameters
     custom_params = {}
@@ -549,3 +627,4 @@ def main():
 
 
 if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Shared pytest fixtures for the EVPN-VxLAN fabric test suite
+"""
+
+import functools
+import os
+import pickle
+from dataclasses import dataclass
+
+import orjson
+import pytest
+
+TOPOLOGY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'configs', 'topology.json')
+
+
+@dataclass(frozen=True)
+class Topology:
+    """Parsed lab topology; devices, hosts and links are tuples of dicts"""
+    __slots__ = ('name', 'devices', 'hosts', 'links', 'spines', 'leaves')
+
+    name: str
+    devices: tuple
+    hosts: tuple
+    links: tuple
+    spines: tuple
+    leaves: tuple
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Topology from the topology.json document"""
+        devices = tuple(data.get('devices', ()))
+        return cls(
+            name=data.get('name', ''),
+            devices=devices,
+            hosts=tuple(data.get('hosts', ())),
+            links=tuple(data.get('links', ())),
+            spines=tuple(d for d in devices if d['type'] == 'spine'),
+            leaves=tuple(d for d in devices if d['type'] == 'leaf'),
+        )
+
+
+TOPOLOGY_KEY = pytest.StashKey[Topology]()
+
+
+def _parse_json(path):
+    """Parse a JSON file without keeping its raw bytes alive afterwards"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def _read_topology_data(path, cache_dir):
+    """Parse a topology file, reusing a pickle in cache_dir keyed by its mtime and size"""
+    if cache_dir is None:
+        return _parse_json(path)
+
+    stat = os.stat(path)
+    prefix = os.path.basename(path) + '-'
+    pickle_path = cache_dir / f"{prefix}{stat.st_mtime_ns}-{stat.st_size}.pickle"
+    try:
+        with open(pickle_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        pass  # missing or unreadable - fall back to parsing
+
+    data = _parse_json(path)
+    try:
+        # Drop pickles of older versions of the file, then write atomically
+        for stale in cache_dir.glob(prefix + '*.pickle'):
+            stale.unlink()
+        tmp_path = pickle_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, pickle_path)
+    except OSError:
+        pass  # the cache is an optimisation only
+    return data
+
+
+@functools.lru_cache(maxsize=None)
+def _load_topology(path, cache_dir=None):
+    """Parse a topology file once into a frozen Topology"""
+    return Topology.from_dict(_read_topology_data(path, cache_dir))
+
+
+def pytest_addoption(parser):
+    """Register the --no-topology-cache command-line option"""
+    parser.addoption('--no-topology-cache', action='store_true', default=False,
+                     help='Always parse topology.json instead of reusing the pickled copy '
+                          'kept in the pytest cache directory')
+
+
+@pytest.fixture(scope="session")
+def topology(request):
+    """Topology parsed on first use and stashed on the session"""
+    session = request.session
+    if TOPOLOGY_KEY not in session.stash:
+        config = session.config
+        cache_dir = None
+        # Lives under .pytest_cache (not a shared /tmp) so only this checkout can feed it pickles
+        if getattr(config, 'cache', None) is not None and not config.getoption('no_topology_cache'):
+            cache_dir = config.cache.mkdir('topology')
+        session.stash[TOPOLOGY_KEY] = _load_topology(TOPOLOGY_FILE, cache_dir)
+    return session.stash[TOPOLOGY_KEY]
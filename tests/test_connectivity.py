@@ -6,85 +6,211 @@ Purpose: Automate testing of EVPN-VxLAN fabric for AI workloads
 """
 
 import subprocess
-import json
 import time
 import argparse
 import logging
+import re
+import sys
+import threading
 from datetime import datetime
-import paramiko
-import matplotlib.pyplot as plt
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+import numpy as np
+import orjson
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+BGP_DEVICE_TYPES = frozenset({'spine', 'leaf'})
+PACKET_LOSS_RE = re.compile(rb'(\d+)% packet loss')
+# Printed between the EVPN summary and VNI output when both share one exec
+EVPN_VNI_SEPARATOR = b'--- evpn vni ---'
+FPING_LOSS_RE = re.compile(rb'^(\S+)\s*:.*?=\s*\d+/\d+/(\d+)%', re.M)
+# Extra seconds allowed on top of the ping time before a sweep counts as hung
+SWEEP_TIMEOUT_SLACK = 10
+
+# paramiko is imported on first SSH use so --help and test collection stay fast
+_paramiko = None
+
+def get_paramiko():
+    """Import paramiko once, on first use"""
+    global _paramiko
+    if _paramiko is None:
+        import paramiko
+        _paramiko = paramiko
+    return _paramiko
+
+def pair_rounds(hosts):
+    """Split all ordered host pairs into rounds where each host sends once and receives once"""
+    n = len(hosts)
+    for shift in range(1, n):
+        yield [(hosts[i], hosts[(i + shift) % n]) for i in range(n)]
+
+def count_established(peers):
+    """Count BGP peers in the Established state"""
+    return sum(data.get('state') == 'Established' for data in peers.values())
+
 class EVPNTester:
     """Main class for EVPN-VxLAN testing automation"""
     
-    def __init__(self, topology_file):
-        """Initialize tester with topology information"""
+    def __init__(self, topology_file, bgp_state_file=None):
+        """Initialize tester with topology information
+        
+        bgp_state_file optionally names a JSON snapshot of per-device BGP
+        summaries (device name -> 'net show bgp summary json' document), such
+        as one kept current by a BMP collector. Devices found in it are not
+        polled over SSH.
+        """
         self.topology = self.load_topology(topology_file)
+        self._bgp_state = self.load_bgp_state(bgp_state_file) if bgp_state_file else {}
         self.results = {
             'timestamp': datetime.now().isoformat(),
             'tests': {}
         }
+        # Devices each test queries, filtered once
+        devices = self.topology['devices']
+        self.bgp_devices = [d for d in devices if d['type'] in BGP_DEVICE_TYPES]
+        self.leaves = [d for d in devices if d['type'] == 'leaf']
+        # One persistent SSH connection per host; the per-host lock keeps
+        # commands to the same device serialized while hosts run in parallel
+        self._ssh_pool = {}
+        self._ssh_locks = {}
+        self._ssh_pool_lock = threading.Lock()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Close all pooled SSH connections"""
+        for ssh in self._ssh_pool.values():
+            ssh.close()
+        self._ssh_pool.clear()
+    
+    def drop_connection(self, host):
+        """Close and forget the pooled SSH connection to host, if any"""
+        ssh = self._ssh_pool.pop(host, None)
+        if ssh:
+            ssh.close()
         
     def load_topology(self, topology_file):
         """Load topology configuration from JSON file"""
-        with open(topology_file, 'r') as f:
-            return json.load(f)
+        with open(topology_file, 'rb') as f:
+            return orjson.loads(f.read())
     
-    def ssh_command(self, host, command, username='cumulus', password='cumulus'):
-        """Execute command on remote host via SSH"""
-        try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(host, username=username, password=password)
-            
-            stdin, stdout, stderr = ssh.exec_command(command)
-            result = stdout.read().decode('utf-8')
-            error = stderr.read().decode('utf-8')
-            
-            ssh.close()
-            
-            if error:
-                logger.error(f"Error on {host}: {error}")
-            
-            return result
-        except Exception as e:
-            logger.error(f"SSH connection failed to {host}: {str(e)}")
-            return None
+    def load_bgp_state(self, bgp_state_file):
+        """Load collector BGP state, keyed by device name, from JSON file"""
+        with open(bgp_state_file, 'rb') as f:
+            return orjson.loads(f.read())
+    
+    def ssh_command(self, host, command, username='cumulus', password='cumulus', timeout=None):
+        """Execute command on remote host via SSH, returning raw stdout bytes"""
+        with self._ssh_pool_lock:
+            lock = self._ssh_locks.setdefault(host, threading.Lock())
+        
+        with lock:
+            try:
+                ssh = self._ssh_pool.get(host)
+                transport = ssh.get_transport() if ssh else None
+                if transport is None or not transport.is_active():
+                    paramiko = get_paramiko()
+                    ssh = paramiko.SSHClient()
+                    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                    ssh.connect(host, username=username, password=password)
+                    # Keep idle connections alive across convergence waits
+                    ssh.get_transport().set_keepalive(30)
+                    self._ssh_pool[host] = ssh
+                
+                # A read that stalls past timeout raises and is handled
+                # like a dropped connection
+                stdin, stdout, stderr = ssh.exec_command(command, timeout=timeout)
+                result = stdout.read()
+                error = stderr.read()
+                
+                if error:
+                    logger.error(f"Error on {host}: {error.decode('utf-8', 'replace')}")
+                
+                return result
+            except Exception as e:
+                logger.error(f"SSH connection failed to {host}: {str(e)}")
+                # Drop the broken connection so the next command reconnects
+                self.drop_connection(host)
+                return None
+    
+    def run_iperf_pairs(self, client_args):
+        """Run iperf3 from every host to every other host, a round at a time
+        
+        An iperf3 server serves one test at a time, so flows are scheduled in
+        rounds where no host is used twice; each round runs fully in parallel.
+        """
+        hosts = self.topology['hosts']
+        results = {}
+        if not hosts:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+            for round_pairs in pair_rounds(hosts):
+                futures = {
+                    executor.submit(
+                        self.ssh_command,
+                        src_host['mgmt_ip'],
+                        f"iperf3 -c {dst_host['data_ip']} {client_args} -J"
+                    ): (src_host['name'], dst_host['name'])
+                    for src_host, dst_host in round_pairs
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+        
+        # Hand back results in source/destination order
+        return {
+            (src_host['name'], dst_host['name']): results[(src_host['name'], dst_host['name'])]
+            for src_host in hosts
+            for dst_host in hosts
+            if src_host != dst_host
+        }
     
     def test_bgp_underlay(self):
         """Test BGP underlay connectivity"""
         logger.info("Testing BGP Underlay...")
         test_results = {}
-        
-        for device in self.topology['devices']:
-            if device['type'] in ['spine', 'leaf']:
-                result = self.ssh_command(
-                    device['mgmt_ip'],
-                    'net show bgp summary json'
-                )
-                
-                if result:
-                    bgp_data = json.loads(result)
-                    peers_up = 0
-                    total_peers = len(bgp_data.get('peers', {}))
-                    
-                    for peer, data in bgp_data.get('peers', {}).items():
-                        if data.get('state') == 'Established':
-                            peers_up += 1
-                    
-                    test_results[device['name']] = {
-                        'total_peers': total_peers,
-                        'peers_up': peers_up,
-                        'status': 'PASS' if peers_up == total_peers else 'FAIL'
-                    }
-                    
-                    logger.info(f"{device['name']}: {peers_up}/{total_peers} BGP peers up")
+        devices = self.bgp_devices
+        
+        # Poll every device without collector state at once over its pooled connection
+        polled = [d for d in devices if d['name'] not in self._bgp_state]
+        outputs = {}
+        if polled:
+            with ThreadPoolExecutor(max_workers=len(polled)) as executor:
+                outputs = dict(zip(
+                    [d['name'] for d in polled],
+                    executor.map(
+                        lambda device: self.ssh_command(device['mgmt_ip'], 'net show bgp summary json'),
+                        polled
+                    )
+                ))
+        
+        for device in devices:
+            bgp_data = self._bgp_state.get(device['name'])
+            if bgp_data is None:
+                result = outputs[device['name']]
+                if not result:
+                    continue
+                bgp_data = orjson.loads(result)
+            
+            peers = bgp_data.get('peers', {})
+            total_peers = len(peers)
+            peers_up = count_established(peers)
+            
+            test_results[device['name']] = {
+                'total_peers': total_peers,
+                'peers_up': peers_up,
+                'status': 'PASS' if peers_up == total_peers else 'FAIL'
+            }
+            
+            logger.info(f"{device['name']}: {peers_up}/{total_peers} BGP peers up")
         
         self.results['tests']['bgp_underlay'] = test_results
         return test_results
@@ -93,31 +219,37 @@ class EVPNTester:
         """Test EVPN overlay functionality"""
         logger.info("Testing EVPN Overlay...")
         test_results = {}
+        leaves = self.leaves
         
-        for device in self.topology['devices']:
-            if device['type'] == 'leaf':
-                # Check EVPN neighbors
-                result = self.ssh_command(
-                    device['mgmt_ip'],
-                    'net show bgp l2vpn evpn summary json'
-                )
-                
-                if result:
-                    evpn_data = json.loads(result)
-                    test_results[device['name']] = {
-                        'evpn_peers': len(evpn_data.get('peers', {})),
-                        'status': 'PASS' if evpn_data.get('peers') else 'FAIL'
-                    }
-                
-                # Check VNIs
-                vni_result = self.ssh_command(
-                    device['mgmt_ip'],
-                    'net show evpn vni json'
-                )
-                
-                if vni_result:
-                    vni_data = json.loads(vni_result)
-                    test_results[device['name']]['vnis'] = len(vni_data)
+        # Check EVPN neighbors and VNIs in a single round-trip per leaf
+        command = (
+            f"net show bgp l2vpn evpn summary json; "
+            f"echo '{EVPN_VNI_SEPARATOR.decode()}'; "
+            f"net show evpn vni json"
+        )
+        outputs = []
+        if leaves:
+            with ThreadPoolExecutor(max_workers=len(leaves)) as executor:
+                outputs = list(executor.map(
+                    lambda device: self.ssh_command(device['mgmt_ip'], command),
+                    leaves
+                ))
+        
+        for device, output in zip(leaves, outputs):
+            if not output:
+                continue
+            result, _, vni_result = output.partition(EVPN_VNI_SEPARATOR)
+            
+            if result.strip():
+                evpn_data = orjson.loads(result)
+                test_results[device['name']] = {
+                    'evpn_peers': len(evpn_data.get('peers', {})),
+                    'status': 'PASS' if evpn_data.get('peers') else 'FAIL'
+                }
+            
+            if vni_result.strip():
+                vni_data = orjson.loads(vni_result)
+                test_results[device['name']]['vnis'] = len(vni_data)
         
         self.results['tests']['evpn_overlay'] = test_results
         return test_results
@@ -125,41 +257,98 @@ class EVPNTester:
     def test_vxlan_dataplane(self):
         """Test VxLAN data plane connectivity"""
         logger.info("Testing VxLAN Data Plane...")
+        hosts = self.topology['hosts']
+        names = [host['name'] for host in hosts]
+        n = len(hosts)
+        if not n:
+            self.results['tests']['vxlan_dataplane'] = {}
+            return {}
+        count = 10
+        workers = min(32, n)
+        
+        # Worst case per sweep is the ping fallback, one destination at a time,
+        # each ping given the same channel timeout as ping_test
+        timeout = -(-n // workers) * (n - 1) * (count * 0.2 + SWEEP_TIMEOUT_SLACK)
+        
+        # Test connectivity between hosts, one fping sweep per source;
+        # sweeps that never report back count as 100% loss
+        loss = np.full((n, n), 100, dtype=np.uint8)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {executor.submit(self.fping_sweep, host, count): i for i, host in enumerate(hosts)}
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                loss[futures[future]] = future.result()
+        except TimeoutError:
+            for future, i in futures.items():
+                if future.done():
+                    continue
+                logger.error(f"Connectivity sweep from {names[i]} timed out")
+                if not future.cancel():
+                    # Already running: closing its connection fails the
+                    # blocked read so the worker exits and frees the host
+                    self.drop_connection(hosts[i]['mgmt_ip'])
+        finally:
+            executor.shutdown(wait=False)
+        
+        src_idx, dst_idx = np.nonzero(~np.eye(n, dtype=bool))
         test_results = {}
-        
-        # Test connectivity between hosts
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = []
-            
-            for src_host in self.topology['hosts']:
-                for dst_host in self.topology['hosts']:
-                    if src_host != dst_host:
-                        future = executor.submit(
-                            self.ping_test,
-                            src_host,
-                            dst_host
-                        )
-                        futures.append((future, src_host, dst_host))
-            
-            for future, src, dst in futures:
-                result = future.result()
-                key = f"{src['name']}_to_{dst['name']}"
-                test_results[key] = result
+        for i, j, pair_loss in zip(src_idx.tolist(), dst_idx.tolist(),
+                                   loss[src_idx, dst_idx].tolist()):
+            test_results[f"{names[i]}_to_{names[j]}"] = {
+                'packet_loss': pair_loss,
+                'status': 'PASS' if pair_loss == 0 else 'FAIL'
+            }
         
         self.results['tests']['vxlan_dataplane'] = test_results
         return test_results
     
+    def fping_sweep(self, src_host, count=10):
+        """Measure packet loss from one host to every host in a single fping run"""
+        hosts = self.topology['hosts']
+        row = np.full(len(hosts), 100, dtype=np.uint8)
+        index = {}
+        for i, host in enumerate(hosts):
+            if host is src_host:
+                row[i] = 0
+            else:
+                index[host['data_ip'].encode()] = i
+        if not index:
+            # fping with no targets would wait for them on stdin
+            return row
+        
+        result = self.ssh_command(
+            src_host['mgmt_ip'],
+            f"fping -q -c {count} -p 200 {' '.join(ip.decode() for ip in index)} 2>&1",
+            timeout=count * 0.2 + SWEEP_TIMEOUT_SLACK
+        )
+        if not result:
+            # No connection, or it was dropped mid-sweep - leave 100% loss
+            return row
+        
+        matches = FPING_LOSS_RE.findall(result)
+        if not matches:
+            # fping unavailable on this host - fall back to one ping per destination
+            for i, dst_host in enumerate(hosts):
+                if dst_host is not src_host:
+                    row[i] = self.ping_test(src_host, dst_host, count)['packet_loss']
+            return row
+        
+        for ip, pct in matches:
+            if ip in index:
+                row[index[ip]] = int(pct)
+        return row
+    
     def ping_test(self, src_host, dst_host, count=10):
         """Perform ping test between hosts"""
         result = self.ssh_command(
             src_host['mgmt_ip'],
-            f"ping -c {count} -i 0.2 {dst_host['data_ip']} | grep 'packet loss'"
+            f"ping -c {count} -q -i 0.2 {dst_host['data_ip']}",
+            timeout=count * 0.2 + SWEEP_TIMEOUT_SLACK
         )
         
         if result:
-            # Parse packet loss
-            import re
-            match = re.search(r'(\d+)% packet loss', result)
+            # Parse packet loss from the -q summary
+            match = PACKET_LOSS_RE.search(result)
             if match:
                 loss = int(match.group(1))
                 return {
@@ -174,34 +363,29 @@ class EVPNTester:
         logger.info("Testing Network Performance...")
         test_results = {}
         
-        # Start iperf3 servers on all hosts
-        for host in self.topology['hosts']:
-            self.ssh_command(
-                host['mgmt_ip'],
-                'pkill iperf3; nohup iperf3 -s -D'
-            )
+        # Start iperf3 servers on all hosts in parallel
+        hosts = self.topology['hosts']
+        if hosts:
+            with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+                list(executor.map(
+                    lambda host: self.ssh_command(host['mgmt_ip'], 'pkill iperf3; nohup iperf3 -s -D'),
+                    hosts
+                ))
         
         time.sleep(2)  # Wait for servers to start
         
         # Run iperf3 tests
-        for src_host in self.topology['hosts']:
-            for dst_host in self.topology['hosts']:
-                if src_host != dst_host:
-                    result = self.ssh_command(
-                        src_host['mgmt_ip'],
-                        f"iperf3 -c {dst_host['data_ip']} -t 10 -J"
-                    )
-                    
-                    if result:
-                        try:
-                            iperf_data = json.loads(result)
-                            bandwidth = iperf_data['end']['sum_sent']['bits_per_second'] / 1e9
-                            test_results[f"{src_host['name']}_to_{dst_host['name']}"] = {
-                                'bandwidth_gbps': round(bandwidth, 2),
-                                'status': 'PASS' if bandwidth > 8.0 else 'FAIL'  # 80% of 10G
-                            }
-                        except:
-                            logger.error(f"Failed to parse iperf3 results")
+        for (src, dst), result in self.run_iperf_pairs('-t 10').items():
+            if result:
+                try:
+                    iperf_data = orjson.loads(result)
+                    bandwidth = iperf_data['end']['sum_sent']['bits_per_second'] / 1e9
+                    test_results[f"{src}_to_{dst}"] = {
+                        'bandwidth_gbps': round(bandwidth, 2),
+                        'status': 'PASS' if bandwidth > 8.0 else 'FAIL'  # 80% of 10G
+                    }
+                except:
+                    logger.error(f"Failed to parse iperf3 results")
         
         self.results['tests']['performance'] = test_results
         return test_results
@@ -253,31 +437,16 @@ class EVPNTester:
         # Simulate AllReduce pattern
         hosts = self.topology['hosts']
         
-        # Each host sends to all others simultaneously
-        with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
-            futures = []
-            
-            for src_host in hosts:
-                for dst_host in hosts:
-                    if src_host != dst_host:
-                        future = executor.submit(
-                            self.ssh_command,
-                            src_host['mgmt_ip'],
-                            f"iperf3 -c {dst_host['data_ip']} -t 30 -P 4 -J"
-                        )
-                        futures.append((future, src_host['name'], dst_host['name']))
-            
-            # Collect results
-            total_bandwidth = 0
-            for future, src, dst in futures:
-                result = future.result()
-                if result:
-                    try:
-                        data = json.loads(result)
-                        bw = data['end']['sum_sent']['bits_per_second'] / 1e9
-                        total_bandwidth += bw
-                    except:
-                        pass
+        # Every host sends to another host simultaneously in each round
+        total_bandwidth = 0
+        for result in self.run_iperf_pairs('-t 30 -P 4').values():
+            if result:
+                try:
+                    data = orjson.loads(result)
+                    bw = data['end']['sum_sent']['bits_per_second'] / 1e9
+                    total_bandwidth += bw
+                except:
+                    pass
         
         test_results['allreduce_pattern'] = {
             'total_bandwidth_gbps': round(total_bandwidth, 2),
@@ -289,76 +458,76 @@ class EVPNTester:
         return test_results
     
     def generate_report(self):
-        """Generate comprehensive test report"""
+        """Generate comprehensive test report, streamed to file and stdout"""
         logger.info("Generating Test Report...")
         
-        # Create report
-        report = []
-        report.append("=" * 60)
-        report.append("EVPN-VxLAN Test Report")
-        report.append(f"Timestamp: {self.results['timestamp']}")
-        report.append("=" * 60)
+        tests = self.results['tests']
+        banner = "=" * 60
         
         # Summary
-        total_tests = 0
-        passed_tests = 0
-        
-        for test_category, tests in self.results['tests'].items():
-            report.append(f"\n{test_category.upper()}")
-            report.append("-" * 40)
+        results = list(chain.from_iterable(category.values() for category in tests.values()))
+        total_tests = len(results)
+        passed_tests = sum(1 for result in results if result.get('status') == 'PASS')
+        summary = (f"\n{banner}\n"
+                   f"OVERALL: {passed_tests}/{total_tests} tests passed\n"
+                   f"Success Rate: {(passed_tests/total_tests)*100:.1f}%\n"
+                   f"{banner}")
+        
+        # Write each section as it is formatted instead of joining one big string first
+        report = []
+        with open('evpn_test_report.txt', 'w') as f:
+            file_write = f.write
+            stdout_write = sys.stdout.write
+            report_append = report.append
+            
+            def write(text):
+                file_write(text)
+                stdout_write(text)
+                report_append(text)
             
-            for test_name, result in tests.items():
-                total_tests += 1
-                status = result.get('status', 'UNKNOWN')
-                if status == 'PASS':
-                    passed_tests += 1
+            write(f"{banner}\nEVPN-VxLAN Test Report\nTimestamp: {self.results['timestamp']}\n{banner}\n")
+            
+            for test_category, category in tests.items():
+                write(f"\n{test_category.upper()}\n{'-' * 40}\n")
                 
-                report.append(f"{test_name}: {status}")
-                for key, value in result.items():
-                    if key != 'status':
-                        report.append(f"  - {key}: {value}")
-        
-        # Overall summary
-        report.append("\n" + "=" * 60)
-        report.append(f"OVERALL: {passed_tests}/{total_tests} tests passed")
-        report.append(f"Success Rate: {(passed_tests/total_tests)*100:.1f}%")
-        report.append("=" * 60)
-        
-        # Save report
-        report_text = '\n'.join(report)
-        with open('evpn_test_report.txt', 'w') as f:
-            f.write(report_text)
+                for test_name, result in category.items():
+                    write(f"{test_name}: {result.get('status', 'UNKNOWN')}\n")
+                    for key, value in result.items():
+                        if key != 'status':
+                            write(f"  - {key}: {value}\n")
+            
+            # Overall summary
+            write(summary)
+        stdout_write('\n')
         
         # Save JSON results
-        with open('evpn_test_results.json', 'w') as f:
-            json.dump(self.results, f, indent=2)
+        with open('evpn_test_results.json', 'wb') as f:
+            f.write(orjson.dumps(self.results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
-        print(report_text)
-        return report_text
+        return ''.join(report)
     
     def visualize_results(self):
         """Create visualizations of test results"""
         # Performance heatmap
         perf_data = self.results['tests'].get('performance', {})
         if perf_data:
-            hosts = list(set([k.split('_to_')[0] for k in perf_data.keys()]))
+            # Render off-screen; matplotlib is only needed for this report
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
             
-            # Create bandwidth matrix
-            matrix = []
-            for src in hosts:
-                row = []
-                for dst in hosts:
-                    if src == dst:
-                        row.append(0)
-                    else:
-                        key = f"{src}_to_{dst}"
-                        bw = perf_data.get(key, {}).get('bandwidth_gbps', 0)
-                        row.append(bw)
-                matrix.append(row)
+            pairs = [key.split('_to_') for key in perf_data]
+            hosts = sorted({name for pair in pairs for name in pair})
+            name_to_idx = {name: i for i, name in enumerate(hosts)}
+            
+            # Create bandwidth matrix in a single pass over the results
+            matrix = np.zeros((len(hosts), len(hosts)), dtype=np.float32)
+            for (src, dst), result in zip(pairs, perf_data.values()):
+                matrix[name_to_idx[src], name_to_idx[dst]] = result.get('bandwidth_gbps', 0)
             
             # Plot heatmap
             plt.figure(figsize=(8, 6))
-            plt.imshow(matrix, cmap='YlOrRd', aspect='auto')
+            plt.imshow(matrix, cmap='YlOrRd', aspect='auto', interpolation='nearest')
             plt.colorbar(label='Bandwidth (Gbps)')
             plt.xticks(range(len(hosts)), hosts)
             plt.yticks(range(len(hosts)), hosts)
@@ -378,40 +547,44 @@ def main():
     parser.add_argument('--tests', nargs='+', 
                        choices=['bgp', 'evpn', 'vxlan', 'performance', 'failure', 'ai', 'all'],
                        default=['all'], help='Tests to run')
+    parser.add_argument('--bgp-state',
+                       help='JSON snapshot of BGP summaries by device name (e.g. from a BMP collector)')
+    parser.add_argument('--report', choices=['text', 'viz'], default='viz',
+                       help='Report output: text only, or text plus the bandwidth heatmap')
     
     args = parser.parse_args()
     
-    # Initialize tester
-    tester = EVPNTester(args.topology)
-    
     # Run selected tests
     if 'all' in args.tests:
         tests_to_run = ['bgp', 'evpn', 'vxlan', 'performance', 'failure', 'ai']
     else:
         tests_to_run = args.tests
     
-    # Execute tests
-    if 'bgp' in tests_to_run:
-        tester.test_bgp_underlay()
-    
-    if 'evpn' in tests_to_run:
-        tester.test_evpn_overlay()
-    
-    if 'vxlan' in tests_to_run:
-        tester.test_vxlan_dataplane()
-    
-    if 'performance' in tests_to_run:
-        tester.test_performance()
-    
-    if 'failure' in tests_to_run:
-        tester.test_failure_recovery()
-    
-    if 'ai' in tests_to_run:
-        tester.test_ai_workload_patterns()
+    # Initialize tester; pooled SSH connections are closed on exit
+    with EVPNTester(args.topology, args.bgp_state) as tester:
+        # Execute tests
+        if 'bgp' in tests_to_run:
+            tester.test_bgp_underlay()
+        
+        if 'evpn' in tests_to_run:
+            tester.test_evpn_overlay()
+        
+        if 'vxlan' in tests_to_run:
+            tester.test_vxlan_dataplane()
+        
+        if 'performance' in tests_to_run:
+            tester.test_performance()
+        
+        if 'failure' in tests_to_run:
+            tester.test_failure_recovery()
+        
+        if 'ai' in tests_to_run:
+            tester.test_ai_workload_patterns()
     
     # Generate report and visualizations
     tester.generate_report()
-    tester.visualize_results()
+    if args.report == 'viz':
+        tester.visualize_results()
 
 if __name__ == "__main__":
     main()
@@ -3,52 +3,126 @@
 Comprehensive test suite for EVPN-VxLAN fabric
 """
 
+import numpy as np
 import pytest
-import json
-import time
-from typing import Dict, List
+from hypothesis import given, settings, strategies as st
+
+# Inclusive (first, last) VNI block reserved for each tenant
+_VNI_RANGES = {
+    'production': (10000, 19999),
+    'development': (20000, 29999),
+    'management': (30000, 39999)
+}
+# The same blocks as a (k, 2) array sorted by first VNI
+_VNI_INTERVALS = np.array(sorted(_VNI_RANGES.values()))
+
+
+def _no_overlap(intervals):
+    """Whether sorted inclusive (first, last) intervals are pairwise disjoint"""
+    intervals = np.asarray(intervals).reshape(-1, 2)
+    return bool((intervals[1:, 0] > intervals[:-1, 1]).all())
+
+
+# AI collective traffic patterns the fabric must carry efficiently
+_PATTERNS = ('allreduce', 'allgather', 'broadcast')
+
+# (interface MTU, encapsulation overhead) for each VxLAN profile in the fabric
+_MTU_PROFILES = np.array([
+    [9216, 50],  # VxLAN over IPv4
+    [9216, 54],  # VxLAN over IPv4 with an 802.1Q-tagged outer frame
+    [9216, 70],  # VxLAN over IPv6
+])
+
+
+class BGPConvergenceModel:
+    """Failover time model: BFD failure detection plus BGP reconvergence
+    
+    Detection takes detect-multiplier missed BFD intervals (50 ms x 3 as
+    tuned in docs/performance-tuning.md). Reconvergence is the per-scenario
+    withdraw and ECMP repair time from the README failure recovery table.
+    A spine failure only recovers if another spine is left to carry traffic.
+    """
+    
+    RECONVERGENCE_S = {
+        'spine_failure': 0.6,
+        'leaf_failure': 0.4,
+        'link_failure': 0.3,
+    }
+    
+    def __init__(self, topology, bfd_interval_ms=50, detect_multiplier=3):
+        self.bfd_interval_ms = bfd_interval_ms
+        self.detect_multiplier = detect_multiplier
+        self.surviving_spines = len(topology.spines) - 1
+    
+    def convergence_time(self, scenario, bfd_interval_ms=None, detect_multiplier=None):
+        """Seconds from failure until traffic is forwarded on surviving paths
+        
+        Timers default to the model's tuned values; passing them evaluates
+        alternative BFD settings against the same topology.
+        """
+        if scenario == 'spine_failure' and self.surviving_spines < 1:
+            return float('inf')
+        if bfd_interval_ms is None:
+            bfd_interval_ms = self.bfd_interval_ms
+        if detect_multiplier is None:
+            detect_multiplier = self.detect_multiplier
+        return bfd_interval_ms * detect_multiplier / 1000 + self.RECONVERGENCE_S[scenario]
+
+
+@pytest.fixture(scope="session")
+def bgp_model(topology):
+    """Convergence model for the lab topology, built once per session"""
+    return BGPConvergenceModel(topology)
 
 
 class TestEVPNFabric:
     """Test suite for EVPN-VxLAN fabric validation"""
     
-    @pytest.fixture
-    def topology(self):
-        """Load topology for testing"""
-        with open('configs/topology.json', 'r') as f:
-            return json.load(f)
-    
-    def test_bgp_convergence_time(self, topology):
+    @pytest.mark.parametrize("scenario", sorted(BGPConvergenceModel.RECONVERGENCE_S))
+    def test_bgp_convergence_time(self, bgp_model, scenario):
         """Test BGP convergence is within SLA"""
-        start_time = time.time()
-        # Simulate BGP convergence test
-        convergence_time = 0.89  # seconds
+        # Time any real measurement with time.perf_counter_ns(), which is monotonic
+        convergence_time = bgp_model.convergence_time(scenario)
+        assert convergence_time < 1.0, "BGP convergence must be under 1 second"
+    
+    @settings(deadline=None)
+    @given(bfd_interval_ms=st.floats(min_value=1, max_value=50),
+           detect_multiplier=st.integers(min_value=1, max_value=3),
+           scenario=st.sampled_from(sorted(BGPConvergenceModel.RECONVERGENCE_S)))
+    def test_bgp_convergence_with_tighter_timers(self, bgp_model, bfd_interval_ms,
+                                                 detect_multiplier, scenario):
+        """Test BGP convergence stays within SLA for BFD timers at or below the tuned values"""
+        convergence_time = bgp_model.convergence_time(scenario, bfd_interval_ms, detect_multiplier)
         assert convergence_time < 1.0, "BGP convergence must be under 1 second"
     
-    def test_vxlan_mtu(self):
+    @pytest.mark.parametrize("min_mtu", [9000])
+    def test_vxlan_mtu(self, min_mtu):
         """Ensure MTU accounts for VxLAN overhead"""
-        interface_mtu = 9216
-        vxlan_overhead = 50
-        effective_mtu = interface_mtu - vxlan_overhead
-        assert effective_mtu >= 9000, "Effective MTU must support jumbo frames"
+        effective_mtu = _MTU_PROFILES[:, 0] - _MTU_PROFILES[:, 1]
+        assert (effective_mtu >= min_mtu).all(), "Effective MTU must support jumbo frames"
     
-    def test_ai_traffic_patterns(self):
+    @pytest.mark.parametrize("pattern", _PATTERNS)
+    def test_ai_traffic_patterns(self, pattern):
         """Validate AI-specific traffic handling"""
-        patterns = ['allreduce', 'allgather', 'broadcast']
-        for pattern in patterns:
-            # Simulate pattern test
-            efficiency = 0.93  # 93% efficiency
-            assert efficiency > 0.90, f"{pattern} efficiency must exceed 90%"
+        # Simulate pattern test
+        efficiency = 0.93  # 93% efficiency
+        assert efficiency > 0.90, f"{pattern} efficiency must exceed 90%"
     
     def test_multi_tenancy(self, topology):
         """Verify VNI isolation between tenants"""
-        vni_ranges = {
-            'production': range(10000, 19999),
-            'development': range(20000, 29999),
-            'management': range(30000, 39999)
-        }
-        # Verify no overlap
-        assert True, "VNI ranges properly isolated"
+        # Verify no overlap: each block must start after the previous one ends
+        assert _no_overlap(_VNI_INTERVALS), "VNI ranges overlap between tenants"
+
+    @pytest.mark.parametrize("intervals, expected", [
+        ([[10, 20], [15, 30]], False),
+        ([[10, 20], [20, 30]], False),
+        ([[10, 20], [21, 30], [100, 199]], True),
+        ([[10, 20]], True),
+        ([], True),
+    ], ids=["overlapping", "shared-endpoint", "disjoint", "single", "empty"])
+    def test_vni_overlap_check(self, intervals, expected):
+        """Verify the VNI overlap check flags every shared VNI"""
+        assert _no_overlap(intervals) is expected
 
 
 if __name__ == "__main__":